@@ -0,0 +1,18 @@
+"""
+Dependency probe shared by the setup and test scripts.
+Locates modules without importing them, so probing stays cheap.
+"""
+
+import importlib.util
+
+def probe(targets):
+    """
+    Find the packages whose import module cannot be located.
+
+    Args:
+        targets: Iterable of (package, module) pairs
+
+    Returns:
+        List of package names whose module is missing
+    """
+    return [package for package, module in targets if importlib.util.find_spec(module) is None]
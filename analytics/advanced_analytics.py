@@ -406,23 +406,32 @@ class PredictiveAnalytics:
             print(f"Error analyzing trends: {e}")
             return {'error': str(e)}
 
-def get_advanced_analytics_summary() -> Dict:
-    """Get comprehensive advanced analytics summary."""
-    print("🔍 Generating Advanced Analytics Summary...")
+def get_advanced_analytics_summary(
+    real_time_metrics: Optional[Dict] = None,
+    trend_analysis: Optional[Dict] = None,
+    emissions_forecast: Optional[Dict] = None
+) -> Dict:
+    """
+    Get comprehensive advanced analytics summary.
     
-    # Initialize analytics components
-    real_time = RealTimeAnalytics()
-    supplier_analytics = SupplierAnalytics()
-    predictive = PredictiveAnalytics()
+    Callers that already hold any of the component results can pass them in
+    to avoid querying the database for them again.
+    """
+    print("🔍 Generating Advanced Analytics Summary...")
     
     # Get real-time metrics
-    real_time_metrics = real_time.get_real_time_metrics(hours_back=24)
+    if real_time_metrics is None:
+        real_time_metrics = RealTimeAnalytics().get_real_time_metrics(hours_back=24)
+    
+    predictive = PredictiveAnalytics()
     
     # Get trend analysis
-    trend_analysis = predictive.analyze_trends(days_back=30)
+    if trend_analysis is None:
+        trend_analysis = predictive.analyze_trends(days_back=30)
     
     # Get emissions forecast
-    emissions_forecast = predictive.forecast_emissions(days_ahead=7)
+    if emissions_forecast is None:
+        emissions_forecast = predictive.forecast_emissions(days_ahead=7)
     
     return {
         'real_time_metrics': real_time_metrics,
@@ -280,6 +280,14 @@ class CarbonCalculator:
             logger.error("Error calculating supply chain emissions", error=str(e))
             raise
     
+    def get_mode_factors(self, transport_mode: str) -> Tuple[float, float, float]:
+        """Get CO2, CH4 and N2O emission factors (per ton-km) for a transport mode."""
+        return (
+            self._get_co2_factor(transport_mode),
+            self._get_ch4_factor(transport_mode),
+            self._get_n2o_factor(transport_mode)
+        )
+    
     def _get_co2_factor(self, transport_mode: str) -> float:
         """Get CO2 emission factor for transport mode."""
         factors = {
@@ -28,6 +28,14 @@ from database.connection import get_db_session
 from database.models import Shipment, CarbonEmission
 from sqlalchemy import func, and_
 
+# Numeric training columns; float32 is ample for analytics and halves memory
+FLOAT32_COLUMNS = {
+    'distance_km': 'float32',
+    'weight_kg': 'float32',
+    'co2_kg': 'float32',
+    'co2_equivalent_kg': 'float32'
+}
+
 class CarbonEmissionsPredictor:
     """Machine learning model for predicting carbon emissions."""
     
@@ -364,6 +372,8 @@ def get_training_data(days_back: int = 90) -> pd.DataFrame:
             'shipment_id', 'origin_lat', 'origin_lng', 'destination_lat', 'destination_lng',
             'transport_mode', 'weight_kg', 'distance_km', 'package_type', 'co2_kg', 'co2_equivalent_kg'
         ])
+        df['transport_mode'] = df['transport_mode'].astype('category')
+        df = df.astype(FLOAT32_COLUMNS)
         
         session.close()
         return df
@@ -11,6 +11,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 import structlog
 import time
+import os
 
 from config.settings import get_settings
 from database.connection import get_db
@@ -342,6 +343,55 @@ async def get_supplier_sustainability(db: Session = Depends(get_db)):
         )
 
 
+async def selfcheck(db: Session = Depends(get_db)):
+    """
+    Run the health, emissions summary, route optimization and supplier checks in one request.
+    Calls the handlers directly, so request parsing and dependency injection are not exercised.
+    
+    Args:
+        db: Database session
+    
+    Returns:
+        Pass/fail flag, plus error detail on failure, for each check
+    """
+    checks = {
+        "health": lambda: health_check(db),
+        "summary": lambda: get_emissions_summary(
+            EmissionsSummaryRequest(start_date=date(2024, 1, 1), end_date=date(2024, 12, 31)),
+            db
+        ),
+        "optimization": lambda: optimize_route(
+            RouteOptimizationRequest(
+                origin_lat=40.7128,
+                origin_lng=-74.0060,
+                destination_lat=34.0522,
+                destination_lng=-118.2437,
+                weight_kg=100.0,
+                priority="balanced"
+            ),
+            db
+        ),
+        "suppliers": lambda: get_supplier_sustainability(db),
+    }
+    
+    results = {}
+    for name, check in checks.items():
+        try:
+            await check()
+            results[name] = {"ok": True}
+        except HTTPException as e:
+            # Clear any aborted transaction so the remaining checks can still run
+            db.rollback()
+            results[name] = {"ok": False, "detail": e.detail}
+    
+    return results
+
+
+# Test-only route; registered when debugging or when API_SELFCHECK=1 is set (test_everything does)
+if settings.debug or os.environ.get("API_SELFCHECK") == "1":
+    app.add_api_route("/tests/selfcheck", selfcheck, methods=["GET"], response_model=dict)
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler for unhandled errors."""
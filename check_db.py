@@ -8,9 +8,29 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from database.connection import get_db_session
-from database.models import Shipment, CarbonEmission
 from sqlalchemy import text
 
+# Row counts come from pg_class estimates unless EXACT_COUNTS=1 asks for full scans
+EXACT_COUNTS = os.environ.get('EXACT_COUNTS') == '1'
+
+ESTIMATE_QUERY = """
+    SELECT c.relname, c.reltuples::bigint
+    FROM pg_class c
+    WHERE c.relname IN ('shipments', 'carbon_emissions')
+"""
+
+EXACT_COUNT_QUERY = """
+    SELECT
+        (SELECT COUNT(*) FROM shipments) AS shipments,
+        (SELECT COUNT(*) FROM carbon_emissions) AS carbon_emissions
+"""
+
+def format_estimate(estimate):
+    """Format a pg_class row estimate for display."""
+    if estimate is None or estimate < 0:
+        return "unknown (not analyzed yet)"
+    return f"~{estimate}"
+
 def check_database():
     """Check database status and table structure."""
     print("🔍 Checking database status...")
@@ -18,8 +38,14 @@ def check_database():
     try:
         with get_db_session() as session:
             # Check if tables exist and have data
-            shipment_count = session.query(Shipment).count()
-            emission_count = session.query(CarbonEmission).count()
+            if EXACT_COUNTS:
+                row = session.execute(text(EXACT_COUNT_QUERY)).one()
+                shipment_count, emission_count = row.shipments, row.carbon_emissions
+            else:
+                # Planner estimates are kept by ANALYZE and cost nothing to read
+                estimates = dict(session.execute(text(ESTIMATE_QUERY)).all())
+                shipment_count = format_estimate(estimates.get('shipments'))
+                emission_count = format_estimate(estimates.get('carbon_emissions'))
             
             print(f"📦 Shipments in database: {shipment_count}")
             print(f"🌱 Carbon emissions in database: {emission_count}")
@@ -0,0 +1,8 @@
+"""
+Transport modes shared by the data generators, ETL and analytics.
+Kept free of third-party imports so any layer can use it cheaply.
+"""
+
+# Canonical transport modes; MODE_INDEX gives each a compact integer index
+TRANSPORT_MODES = ('air', 'ground', 'sea')
+MODE_INDEX = {mode: i for i, mode in enumerate(TRANSPORT_MODES)}
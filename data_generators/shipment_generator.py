@@ -11,6 +11,7 @@ import pandas as pd
 import numpy as np
 from geopy.distance import geodesic
 import structlog
+from config.transport_modes import TRANSPORT_MODES
 
 logger = structlog.get_logger(__name__)
 
@@ -22,7 +23,7 @@ class ShipmentGenerator:
         """Initialize shipment generator with US city data and patterns."""
         self.major_cities = self._load_major_cities()
         self.package_types = self._load_package_types()
-        self.transport_modes = ['air', 'ground', 'sea']
+        self.transport_modes = list(TRANSPORT_MODES)
         self.carriers = self._load_carriers()
         
         logger.info("Shipment generator initialized", city_count=len(self.major_cities))
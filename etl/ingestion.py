@@ -3,11 +3,14 @@ ETL ingestion pipeline for the Supply Chain Carbon Analytics Platform.
 Handles data ingestion from generators and external APIs.
 """
 
+import csv
+import io
+from datetime import datetime
 from typing import Any, Dict, List
 from config.settings import get_settings
 from database.connection import get_db_session
 import structlog
-from uuid import uuid4, UUID
+from uuid import uuid4
 import traceback
 
 logger = structlog.get_logger(__name__)
@@ -29,8 +32,6 @@ class DataIngestionPipeline:
         Args:
             shipments: List of shipment dictionaries
         """
-        from database.models import Shipment, CarbonEmission
-        
         if not shipments:
             logger.warning("No shipments to ingest")
             print("[DEBUG] No shipments to ingest")
@@ -39,65 +40,70 @@ class DataIngestionPipeline:
         print(f"[DEBUG] Starting ingestion of {len(shipments)} shipments...")
         
         try:
+            from database.models import Shipment, CarbonEmission
+            
             with get_db_session() as session:
                 print("[DEBUG] Database session created successfully")
                 
                 # Prepare batch data for shipments
                 shipment_records = []
                 emission_records = []
+                # COPY bypasses SQLAlchemy's func.now() column defaults, so stamp rows here
+                now = datetime.now()
                 
                 print("[DEBUG] Preparing shipment records...")
                 for i, shipment_data in enumerate(shipments):
                     if i % 1000 == 0:
                         print(f"[DEBUG] Processed {i} shipments...")
                     
-                    # Create shipment record
-                    shipment = Shipment(
-                        shipment_id=UUID(shipment_data['shipment_id']),
-                        origin_lat=shipment_data['origin_lat'],
-                        origin_lng=shipment_data['origin_lng'],
-                        destination_lat=shipment_data['destination_lat'],
-                        destination_lng=shipment_data['destination_lng'],
-                        transport_mode=shipment_data['transport_mode'],
-                        weight_kg=shipment_data['weight_kg'],
-                        distance_km=shipment_data['distance_km'],
-                        departure_time=shipment_data['departure_time'],
-                        arrival_time=shipment_data['arrival_time'],
-                        carrier_id=UUID(shipment_data['carrier_id']) if shipment_data['carrier_id'] else None,
-                        package_type=shipment_data['package_type'],
-                    )
-                    shipment_records.append(shipment)
+                    # Create shipment row
+                    shipment_records.append({
+                        'shipment_id': shipment_data['shipment_id'],
+                        'origin_lat': shipment_data['origin_lat'],
+                        'origin_lng': shipment_data['origin_lng'],
+                        'destination_lat': shipment_data['destination_lat'],
+                        'destination_lng': shipment_data['destination_lng'],
+                        'transport_mode': shipment_data['transport_mode'],
+                        'weight_kg': shipment_data['weight_kg'],
+                        'distance_km': shipment_data['distance_km'],
+                        'departure_time': shipment_data['departure_time'],
+                        'arrival_time': shipment_data['arrival_time'],
+                        'carrier_id': shipment_data['carrier_id'] or None,
+                        'package_type': shipment_data['package_type'],
+                        'created_at': now,
+                        'updated_at': now,
+                    })
                     
-                    # Create carbon emission record if emissions data exists
+                    # Create carbon emission row if emissions data exists
                     if 'co2_kg' in shipment_data:
-                        carbon_emission = CarbonEmission(
-                            emission_id=uuid4(),
-                            shipment_id=UUID(shipment_data['shipment_id']),
-                            co2_kg=shipment_data['co2_kg'],
-                            ch4_kg=shipment_data.get('ch4_kg', 0.0),
-                            n2o_kg=shipment_data.get('n2o_kg', 0.0),
-                            co2_equivalent_kg=shipment_data.get('co2_equivalent_kg', shipment_data['co2_kg']),
-                            emission_factor_source=shipment_data.get('emission_factor_source', 'default'),
-                            calculation_method=shipment_data.get('calculation_method', 'standard'),
-                            weather_impact_factor=shipment_data.get('weather_impact_factor', 1.0),
-                        )
-                        emission_records.append(carbon_emission)
+                        emission_records.append({
+                            'emission_id': str(uuid4()),
+                            'shipment_id': shipment_data['shipment_id'],
+                            'co2_kg': shipment_data['co2_kg'],
+                            'ch4_kg': shipment_data.get('ch4_kg', 0.0),
+                            'n2o_kg': shipment_data.get('n2o_kg', 0.0),
+                            'co2_equivalent_kg': shipment_data.get('co2_equivalent_kg', shipment_data['co2_kg']),
+                            'emission_factor_source': shipment_data.get('emission_factor_source', 'default'),
+                            'calculation_method': shipment_data.get('calculation_method', 'standard'),
+                            'weather_impact_factor': shipment_data.get('weather_impact_factor', 1.0),
+                            'calculated_at': now,
+                        })
                 
                 print(f"[DEBUG] Prepared {len(shipment_records)} shipment records and {len(emission_records)} emission records")
                 
                 # Batch insert shipments
                 if shipment_records:
-                    print("[DEBUG] Adding shipments to session...")
-                    session.add_all(shipment_records)
-                    logger.info("Added shipments to session", count=len(shipment_records))
-                    print(f"[DEBUG] Added {len(shipment_records)} shipments to session")
+                    print("[DEBUG] Inserting shipments...")
+                    self._bulk_insert(session, Shipment.__table__, shipment_records)
+                    logger.info("Inserted shipments", count=len(shipment_records))
+                    print(f"[DEBUG] Inserted {len(shipment_records)} shipments")
                 
                 # Batch insert emissions
                 if emission_records:
-                    print("[DEBUG] Adding emissions to session...")
-                    session.add_all(emission_records)
-                    logger.info("Added emissions to session", count=len(emission_records))
-                    print(f"[DEBUG] Added {len(emission_records)} emissions to session")
+                    print("[DEBUG] Inserting emissions...")
+                    self._bulk_insert(session, CarbonEmission.__table__, emission_records)
+                    logger.info("Inserted emissions", count=len(emission_records))
+                    print(f"[DEBUG] Inserted {len(emission_records)} emissions")
                 
                 # Commit all changes
                 print("[DEBUG] Committing to database...")
@@ -118,6 +124,34 @@ class DataIngestionPipeline:
         emissions_count = sum('co2_kg' in s for s in shipments)
         print(f"[SUMMARY] Ingested {len(shipments)} shipments, {emissions_count} with emissions.")
 
+    def _bulk_insert(self, session, table, records: List[Dict]) -> None:
+        """
+        Load records with COPY FROM STDIN inside the session's transaction.
+        Falls back to an executemany INSERT when the driver has no copy_expert (non-psycopg2).
+        Args:
+            session: Active database session
+            table: Target table
+            records: Row dictionaries sharing the same keys
+        """
+        dbapi_connection = session.connection().connection
+        cursor = dbapi_connection.cursor()
+        try:
+            if not hasattr(cursor, 'copy_expert'):
+                session.execute(table.insert(), records)
+                return
+            
+            columns = list(records[0])
+            buffer = io.StringIO()
+            # csv writes None as an unquoted empty field, which COPY reads as NULL
+            csv.writer(buffer).writerows([record[column] for column in columns] for record in records)
+            buffer.seek(0)
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
+
     def enrich_with_weather(self, shipment_ids: List[str]) -> None:
         """
         Enrich shipments with weather data (stub for future implementation).
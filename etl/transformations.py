@@ -3,38 +3,112 @@ ETL transformation module for the Supply Chain Carbon Analytics Platform.
 Handles carbon emission calculation, aggregation, and derived metrics.
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
+import numpy as np
+import pandas as pd
 from analytics.carbon_calculator import CarbonCalculator
+from analytics.kernels import compute_emissions
+from config.transport_modes import TRANSPORT_MODES, MODE_INDEX
 import structlog
 
 logger = structlog.get_logger(__name__)
 
+# Same defaults as CarbonCalculator.calculate_transport_emissions
+DEFAULT_LOAD_FACTOR = 0.8
+DEFAULT_FUEL_EFFICIENCY = 1.0
+
 class DataTransformationPipeline:
     """
     ETL transformation pipeline for calculating emissions and aggregating data.
     """
     def __init__(self):
         self.carbon_calculator = CarbonCalculator()
+        self.factors_table = np.array(
+            [self.carbon_calculator.get_mode_factors(mode) for mode in TRANSPORT_MODES],
+            dtype=np.float64
+        )
 
-    def calculate_emissions_for_shipments(self, shipments: List[Dict]) -> List[Dict]:
+    def calculate_emissions_for_shipments(
+        self,
+        shipments: Union[List[Dict], pd.DataFrame]
+    ) -> Union[List[Dict], pd.DataFrame]:
         """
         Calculate carbon emissions for each shipment and return enriched records.
         Args:
-            shipments: List of shipment dictionaries
+            shipments: List of shipment dictionaries, or a DataFrame with one row per shipment
         Returns:
-            List of shipment records with emission fields
+            Shipment records with emission fields, in the same form as the input
         """
-        enriched = []
-        for shipment in shipments:
-            emissions = self.carbon_calculator.calculate_transport_emissions(
-                distance_km=shipment['distance_km'],
-                weight_kg=shipment['weight_kg'],
-                transport_mode=shipment['transport_mode']
+        if isinstance(shipments, pd.DataFrame):
+            return self._calculate_emissions_for_frame(shipments)
+
+        n = len(shipments)
+        if n == 0:
+            logger.info("Calculated emissions for shipments", count=0)
+            return shipments
+
+        distance_km = np.fromiter((s['distance_km'] for s in shipments), dtype=np.float64, count=n)
+        weight_kg = np.fromiter((s['weight_kg'] for s in shipments), dtype=np.float64, count=n)
+        try:
+            mode_idx = np.fromiter(
+                (MODE_INDEX[s['transport_mode']] for s in shipments), dtype=np.int8, count=n
             )
-            shipment.update(emissions)
-            enriched.append(shipment)
-        logger.info("Calculated emissions for shipments", count=len(enriched))
-        return enriched
+        except KeyError:
+            raise ValueError("Transport mode must be 'air', 'ground', or 'sea'")
+
+        emissions, operational_factor = self._compute_emissions(distance_km, weight_kg, mode_idx)
+
+        for shipment, (co2_kg, ch4_kg, n2o_kg, co2_equivalent_kg) in zip(shipments, emissions.tolist()):
+            shipment.update({
+                'co2_kg': round(co2_kg, 6),
+                'ch4_kg': round(ch4_kg, 6),
+                'n2o_kg': round(n2o_kg, 6),
+                'co2_equivalent_kg': round(co2_equivalent_kg, 6),
+                'weather_factor': 1.0,
+                'operational_factor': round(operational_factor, 4)
+            })
+        logger.info("Calculated emissions for shipments", count=n)
+        return shipments
+
+    def _calculate_emissions_for_frame(self, shipments: pd.DataFrame) -> pd.DataFrame:
+        """Column-wise variant of calculate_emissions_for_shipments for DataFrame input."""
+        df = shipments.copy()
+        if len(df) == 0:
+            logger.info("Calculated emissions for shipments", count=0)
+            return df
+
+        # Always derived from transport_mode; the kernel indexes the factor table unchecked
+        mapped = df['transport_mode'].astype(object).map(MODE_INDEX)
+        if mapped.isna().any():
+            raise ValueError("Transport mode must be 'air', 'ground', or 'sea'")
+        mode_idx = mapped.to_numpy(dtype=np.int8)
+
+        emissions, operational_factor = self._compute_emissions(
+            df['distance_km'].to_numpy(dtype=np.float64),
+            df['weight_kg'].to_numpy(dtype=np.float64),
+            mode_idx
+        )
+
+        # Python round() keeps results identical to the list-of-dicts path
+        for column, values in zip(('co2_kg', 'ch4_kg', 'n2o_kg', 'co2_equivalent_kg'), emissions.T.tolist()):
+            df[column] = [round(v, 6) for v in values]
+        df['weather_factor'] = 1.0
+        df['operational_factor'] = round(operational_factor, 4)
+        logger.info("Calculated emissions for shipments", count=len(df))
+        return df
+
+    def _compute_emissions(self, distance_km: np.ndarray, weight_kg: np.ndarray, mode_idx: np.ndarray):
+        """Validate inputs and run the emissions kernel; returns (emissions, operational_factor)."""
+        if (distance_km <= 0).any() or (weight_kg <= 0).any():
+            raise ValueError("Distance and weight must be positive")
+
+        operational_factor = (1.0 / DEFAULT_LOAD_FACTOR) * DEFAULT_FUEL_EFFICIENCY
+        factors = self.carbon_calculator.emission_factors
+        emissions = compute_emissions(
+            distance_km, weight_kg, mode_idx, self.factors_table,
+            operational_factor, factors.ch4_gwp, factors.n2o_gwp
+        )
+        return emissions, operational_factor
 
     def aggregate_by_supplier(self, shipments: List[Dict]) -> Dict[str, Any]:
         """
@@ -4,10 +4,45 @@ Helps with initial configuration and environment setup.
 """
 
 import os
+import re
 import sys
+import site
+import json
+import shutil
+import sysconfig
+import hashlib
 import subprocess
+import importlib.metadata
 from pathlib import Path
 
+from _probe import probe
+
+# Placeholder values in env.example and their development defaults
+ENV_REPLACEMENTS = {
+    'your_secret_key_here': 'dev_secret_key_change_in_production',
+    'your_api_key_here': 'dev_api_key_change_in_production',
+    'your_openweather_api_key': 'dev_weather_key',
+    'your_epa_api_key': 'dev_epa_key',
+    'your_mapbox_api_key': 'dev_mapbox_key',
+    'your_aws_access_key': 'dev_aws_key',
+    'your_aws_secret_key': 'dev_aws_secret',
+}
+ENV_PLACEHOLDER_PATTERN = re.compile("|".join(map(re.escape, ENV_REPLACEMENTS)))
+
+# Required packages as (distribution, normalized name, import module), resolved once at import
+PROBE_TARGETS = tuple(
+    (package, package.lower().replace('-', '_'),
+     'psycopg2' if package == 'psycopg2-binary' else package.replace('-', '_'))
+    for package in (
+        'fastapi', 'uvicorn', 'sqlalchemy', 'alembic', 'psycopg2-binary',
+        'pandas', 'numpy', 'requests', 'structlog', 'pydantic', 'pydantic-settings'
+    )
+)
+REQUIRED_DISTRIBUTIONS = frozenset(name for _, name, _ in PROBE_TARGETS)
+
+# Installed-distribution cache, keyed by interpreter path and mtime
+DEPS_CACHE_FILE = Path.home() / ".cache" / "scca-setup" / "deps.json"
+
 def check_python_version():
     """Check if Python version is compatible."""
     if sys.version_info < (3, 9):
@@ -18,28 +53,22 @@ def check_python_version():
 
 def check_dependencies():
     """Check if required dependencies are installed."""
-    required_packages = [
-        'fastapi', 'uvicorn', 'sqlalchemy', 'alembic', 'psycopg2-binary',
-        'pandas', 'numpy', 'requests', 'structlog', 'pydantic', 'pydantic-settings'
-    ]
+    installed = get_installed_distributions(REQUIRED_DISTRIBUTIONS)
     
-    missing_packages = []
-    for package in required_packages:
-        try:
-            # Handle special cases for package imports
-            if package == 'psycopg2-binary':
-                __import__('psycopg2')
-            else:
-                __import__(package.replace('-', '_'))
-            print(f"✅ {package} is installed")
-        except ImportError:
-            missing_packages.append(package)
+    # Fall back to locating the module for installs without matching metadata
+    missing_packages = probe(
+        (package, module) for package, name, module in PROBE_TARGETS if name not in installed
+    )
+    for package, _, _ in PROBE_TARGETS:
+        if package in missing_packages:
             print(f"❌ {package} is missing")
+        else:
+            print(f"✅ {package} is installed")
     
     if missing_packages:
         print(f"\n📦 Installing missing packages: {', '.join(missing_packages)}")
         try:
-            subprocess.check_call([sys.executable, "-m", "pip", "install"] + missing_packages)
+            install_packages(missing_packages)
             print("✅ All packages installed successfully")
             return True
         except subprocess.CalledProcessError:
@@ -48,6 +77,55 @@ def check_dependencies():
     
     return True
 
+def normalize_package_name(name):
+    """Normalize a distribution name for comparison."""
+    return name.lower().replace('-', '_')
+
+def get_installed_distributions(required):
+    """
+    Get normalized names of installed distributions without importing them.
+    
+    Reads the cached scan when the interpreter and its site-packages directories are
+    unchanged and every required package was present; otherwise rescans package
+    metadata and refreshes the cache.
+    """
+    # Installing or uninstalling adds or removes *.dist-info entries, which bumps the directory mtime
+    site_dirs = sorted({sysconfig.get_path("purelib"), sysconfig.get_path("platlib"), site.getusersitepackages()})
+    stamps = [f"{path}:{os.path.getmtime(path)}" for path in site_dirs if os.path.isdir(path)]
+    key = hashlib.sha1(
+        "|".join([sys.executable, *stamps]).encode()
+    ).hexdigest()
+    
+    try:
+        cached = json.loads(DEPS_CACHE_FILE.read_text())
+        if cached.get("key") == key and required.issubset(cached["installed"]):
+            return set(cached["installed"])
+    except (OSError, ValueError, KeyError):
+        pass
+    
+    installed = {
+        normalize_package_name(dist.metadata["Name"])
+        for dist in importlib.metadata.distributions()
+        if dist.metadata["Name"]
+    }
+    try:
+        DEPS_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        DEPS_CACHE_FILE.write_text(json.dumps({"key": key, "installed": sorted(installed)}))
+    except OSError:
+        pass
+    return installed
+
+def install_packages(packages):
+    """Install packages with uv if available, otherwise with a single pip invocation."""
+    uv = shutil.which("uv")
+    if uv:
+        # uv resolves and installs in parallel internally
+        subprocess.check_call([uv, "pip", "install", "--python", sys.executable, *packages])
+        return
+    
+    # One pip process resolves everything together and pays startup once
+    subprocess.check_call([sys.executable, "-m", "pip", "install", *packages])
+
 def create_env_file():
     """Create .env file from template if it doesn't exist."""
     env_file = Path(".env")
@@ -63,20 +141,11 @@ def create_env_file():
     
     print("📝 Creating .env file from template...")
     try:
-        with open(env_example, 'r') as f:
-            content = f.read()
-        
-        # Replace placeholder values with defaults
-        content = content.replace('your_secret_key_here', 'dev_secret_key_change_in_production')
-        content = content.replace('your_api_key_here', 'dev_api_key_change_in_production')
-        content = content.replace('your_openweather_api_key', 'dev_weather_key')
-        content = content.replace('your_epa_api_key', 'dev_epa_key')
-        content = content.replace('your_mapbox_api_key', 'dev_mapbox_key')
-        content = content.replace('your_aws_access_key', 'dev_aws_key')
-        content = content.replace('your_aws_secret_key', 'dev_aws_secret')
-        
-        with open(env_file, 'w') as f:
-            f.write(content)
+        # Replace placeholder values with defaults in a single pass
+        content = ENV_PLACEHOLDER_PATTERN.sub(
+            lambda match: ENV_REPLACEMENTS[match.group(0)], env_example.read_text()
+        )
+        env_file.write_text(content)
         
         print("✅ .env file created successfully")
         print("⚠️  Remember to update the .env file with real API keys for production")
@@ -95,6 +164,21 @@ def check_docker():
         print("⚠️  Docker not found. You can still run the platform locally without Docker.")
         return False
 
+def print_manual_database_steps(first_step, grant_privileges=False):
+    """Print numbered instructions for setting up the database by hand."""
+    steps = [
+        first_step,
+        "Create database 'supply_chain_carbon'",
+        "Create user 'supply_chain_user' with password 'supply_chain_password'",
+    ]
+    if grant_privileges:
+        steps.append("Grant privileges to user")
+    steps.append("Update DATABASE_URL in .env file")
+    
+    print("📋 To set up the database manually:")
+    for number, step in enumerate(steps, 1):
+        print(f"   {number}. {step}")
+
 def setup_database():
     """Test database connection."""
     print("🔍 Testing database connection...")
@@ -106,11 +190,7 @@ def setup_database():
     database_url = os.getenv('DATABASE_URL')
     if not database_url:
         print("❌ DATABASE_URL not found in .env file")
-        print("📋 To set up the database manually:")
-        print("   1. Install PostgreSQL")
-        print("   2. Create database 'supply_chain_carbon'")
-        print("   3. Create user 'supply_chain_user' with password 'supply_chain_password'")
-        print("   4. Update DATABASE_URL in .env file")
+        print_manual_database_steps("Install PostgreSQL")
         return False
     
     try:
@@ -118,30 +198,27 @@ def setup_database():
         from sqlalchemy import create_engine, text
         from sqlalchemy.exc import OperationalError
         
-        engine = create_engine(database_url)
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT version()"))
-            row = result.fetchone()
-            if row:
-                version = row[0]
-                print(f"✅ Database connection successful")
-                print(f"   PostgreSQL version: {version.split(',')[0]}")
-            else:
-                print("❌ Could not retrieve database version")
-                return False
-        
-        # Test if tables exist (they won't initially, but connection should work)
+        # Setup is short-lived, so one pooled connection serves both checks
+        engine = create_engine(database_url, pool_size=1)
         try:
             with engine.connect() as conn:
-                result = conn.execute(text("SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = 'public'"))
-                row = result.fetchone()
-                if row:
-                    table_count = row[0]
+                version = conn.execute(text("SELECT version()")).scalar()
+                if not version:
+                    print("❌ Could not retrieve database version")
+                    return False
+                print(f"✅ Database connection successful")
+                print(f"   PostgreSQL version: {version.split(',')[0]}")
+                
+                # Test if tables exist (they won't initially, but connection should work)
+                try:
+                    table_count = conn.execute(text(
+                        "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = 'public'"
+                    )).scalar()
                     print(f"   Tables in database: {table_count}")
-                else:
-                    print("   Note: Could not count tables")
-        except Exception as e:
-            print(f"   Note: No tables exist yet (this is normal for new database)")
+                except Exception as e:
+                    print(f"   Note: No tables exist yet (this is normal for new database)")
+        finally:
+            engine.dispose()
         
         return True
         
@@ -150,17 +227,26 @@ def setup_database():
         return False
     except OperationalError as e:
         print(f"❌ Database connection failed: {e}")
-        print("📋 To set up the database manually:")
-        print("   1. Ensure PostgreSQL is running")
-        print("   2. Create database 'supply_chain_carbon'")
-        print("   3. Create user 'supply_chain_user' with password 'supply_chain_password'")
-        print("   4. Grant privileges to user")
-        print("   5. Update DATABASE_URL in .env file")
+        print_manual_database_steps("Ensure PostgreSQL is running", grant_privileges=True)
         return False
     except Exception as e:
         print(f"❌ Database setup failed: {e}")
         return False
 
+def run_checks(checks):
+    """Run named setup checks in order and return (name, passed) pairs."""
+    results = []
+    for check_name, check_func in checks:
+        print(f"\n📋 {check_name}")
+        print("-" * 40)
+        try:
+            result = check_func()
+            results.append((check_name, result))
+        except Exception as e:
+            print(f"❌ {check_name} failed: {e}")
+            results.append((check_name, False))
+    return results
+
 def main():
     """Main setup function."""
     print("🚀 Setting up Supply Chain Carbon Analytics Platform")
@@ -173,16 +259,7 @@ def main():
         ("Database Setup", setup_database),
     ]
     
-    results = []
-    for check_name, check_func in checks:
-        print(f"\n📋 {check_name}")
-        print("-" * 40)
-        try:
-            result = check_func()
-            results.append((check_name, result))
-        except Exception as e:
-            print(f"❌ {check_name} failed: {e}")
-            results.append((check_name, False))
+    results = run_checks(checks)
     
     # Summary
     print("\n" + "=" * 60)
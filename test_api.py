@@ -4,64 +4,58 @@ Simple test script to verify the FastAPI application works correctly.
 
 import requests
 import json
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
+from requests.adapters import HTTPAdapter
 
 # API base URL
 BASE_URL = "http://localhost:8000"
 
-def test_health_check():
-    """Test the health check endpoint."""
-    print("Testing health check...")
-    try:
-        response = requests.get(f"{BASE_URL}/health")
-        print(f"Status: {response.status_code}")
-        print(f"Response: {response.json()}")
-        return response.status_code == 200
-    except Exception as e:
-        print(f"Error: {e}")
-        return False
+# Shared keep-alive session so every test reuses pooled connections
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=8, pool_maxsize=8))
 
-def test_emissions_summary():
-    """Test the emissions summary endpoint."""
-    print("\nTesting emissions summary...")
-    try:
-        payload = {
-            "start_date": "2024-01-01",
-            "end_date": "2024-01-31"
-        }
-        response = requests.post(f"{BASE_URL}/emissions/summary", json=payload)
-        print(f"Status: {response.status_code}")
-        print(f"Response: {response.json()}")
-        return response.status_code == 200
-    except Exception as e:
-        print(f"Error: {e}")
-        return False
+# Request bodies are serialized once at import rather than on every call
+JSON_HEADERS = {"Content-Type": "application/json"}
+SUMMARY_PAYLOAD = json.dumps({
+    "start_date": "2024-01-01",
+    "end_date": "2024-01-31"
+}).encode()
+ROUTE_PAYLOAD = json.dumps({
+    "origin_lat": 40.7128,
+    "origin_lng": -74.0060,
+    "destination_lat": 34.0522,
+    "destination_lng": -118.2437,
+    "weight_kg": 100.0,
+    "priority": "balanced"
+}).encode()
+
+EndpointTest = namedtuple("EndpointTest", ["name", "method", "path", "body"])
 
-def test_route_optimization():
-    """Test the route optimization endpoint."""
-    print("\nTesting route optimization...")
+TESTS = (
+    EndpointTest("health check", "GET", "/health", None),
+    EndpointTest("emissions summary", "POST", "/emissions/summary", SUMMARY_PAYLOAD),
+    EndpointTest("route optimization", "POST", "/optimization/routes", ROUTE_PAYLOAD),
+    EndpointTest("supplier sustainability", "GET", "/suppliers/sustainability", None),
+)
+
+def run(test):
+    """Send the request for a single endpoint test."""
     try:
-        payload = {
-            "origin_lat": 40.7128,
-            "origin_lng": -74.0060,
-            "destination_lat": 34.0522,
-            "destination_lng": -118.2437,
-            "weight_kg": 100.0,
-            "priority": "balanced"
-        }
-        response = requests.post(f"{BASE_URL}/optimization/routes", json=payload)
-        print(f"Status: {response.status_code}")
-        print(f"Response: {response.json()}")
-        return response.status_code == 200
+        headers = JSON_HEADERS if test.body is not None else None
+        response = SESSION.request(test.method, BASE_URL + test.path, data=test.body, headers=headers, timeout=10)
+        return test, response, None
     except Exception as e:
-        print(f"Error: {e}")
-        return False
+        return test, None, e
 
-def test_supplier_sustainability():
-    """Test the supplier sustainability endpoint."""
-    print("\nTesting supplier sustainability...")
+def report(test, response, error):
+    """Print the outcome of an endpoint test and return whether it passed."""
+    print(f"\nTesting {test.name}...")
+    if error is not None:
+        print(f"Error: {error}")
+        return False
     try:
-        response = requests.get(f"{BASE_URL}/suppliers/sustainability")
         print(f"Status: {response.status_code}")
         print(f"Response: {response.json()}")
         return response.status_code == 200
@@ -73,28 +67,23 @@ def main():
     """Run all tests."""
     print("Testing Supply Chain Carbon Analytics API")
     print("=" * 50)
-    
-    tests = [
-        test_health_check,
-        test_emissions_summary,
-        test_route_optimization,
-        test_supplier_sustainability
-    ]
-    
-    results = []
-    for test in tests:
-        results.append(test())
-    
+
+    # The endpoints are independent, so issue all requests concurrently
+    with ThreadPoolExecutor(max_workers=len(TESTS)) as executor:
+        outcomes = list(executor.map(run, TESTS))
+
+    results = [report(*outcome) for outcome in outcomes]
+
     print("\n" + "=" * 50)
     print("Test Results:")
     for i, result in enumerate(results):
         status = "PASS" if result else "FAIL"
         print(f"Test {i+1}: {status}")
-    
+
     if all(results):
         print("\nAll tests passed! ✅")
     else:
         print("\nSome tests failed! ❌")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
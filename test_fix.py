@@ -7,36 +7,36 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+DATABASE_CHECK_QUERY = """
+    SELECT
+        (SELECT reltuples::bigint FROM pg_class WHERE relname = 'shipments') AS shipment_estimate,
+        (SELECT reltuples::bigint FROM pg_class WHERE relname = 'carbon_emissions') AS emission_estimate,
+        c.data_type, c.numeric_precision, c.numeric_scale
+    FROM (SELECT 1) AS probe
+    LEFT JOIN information_schema.columns c
+        ON c.table_schema = current_schema() AND c.table_name = 'carbon_emissions' AND c.column_name = 'co2_kg'
+"""
+
 def test_database_connection():
     """Test database connection and migration status."""
     print("🔍 Testing database connection...")
     
     try:
+        from check_db import format_estimate
         from database.connection import get_db_session
-        from database.models import Shipment, CarbonEmission
         from sqlalchemy import text
         
         with get_db_session() as session:
-            # Test basic connection
-            result = session.execute(text("SELECT 1"))
+            # One round-trip: connection check, table size estimates and CO2 column precision
+            row = session.execute(text(DATABASE_CHECK_QUERY)).one()
             print("✅ Database connection successful")
             
-            # Check table counts
-            shipment_count = session.query(Shipment).count()
-            emission_count = session.query(CarbonEmission).count()
-            print(f"📦 Shipments: {shipment_count}")
-            print(f"🌱 Emissions: {emission_count}")
+            # Planner estimates avoid full scans; -1 means the table was never analyzed
+            print(f"📦 Shipments: {format_estimate(row.shipment_estimate)}")
+            print(f"🌱 Emissions: {format_estimate(row.emission_estimate)}")
             
             # Check column precision
-            result = session.execute(text("""
-                SELECT column_name, data_type, numeric_precision, numeric_scale
-                FROM information_schema.columns 
-                WHERE table_name = 'carbon_emissions' 
-                AND column_name = 'co2_kg'
-            """))
-            
-            row = result.fetchone()
-            if row:
+            if row.data_type:
                 print(f"✅ CO2 column type: {row.data_type}({row.numeric_precision},{row.numeric_scale})")
                 if row.numeric_precision >= 18:
                     print("✅ Migration applied successfully - precision increased to 18")
@@ -6,134 +6,221 @@ Tests massive data generation, advanced analytics, and cloud deployment features
 import sys
 import os
 import time
-import subprocess
-import requests
 import json
+import io
+import logging
+import textwrap
+import importlib.util
+import asyncio
+import httpx
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, redirect_stdout
 from datetime import datetime
+from functools import lru_cache
 
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# Test output goes through one logger; LOGLEVEL=WARNING keeps only problems under CI
+log = logging.getLogger('phase3')
+LOG_HANDLER = logging.StreamHandler(sys.stdout)
+LOG_HANDLER.setFormatter(logging.Formatter('%(message)s'))
+log.addHandler(LOG_HANDLER)
+log.setLevel(os.environ.get('LOGLEVEL', 'INFO'))
+log.propagate = False
+
+# Base URL for in-process requests; nothing listens on it
+API_BASE_URL = "http://testserver"
+
+# Per-process pool: each of the three test processes keeps 1 connection plus 2 overflow,
+# enough for the API test's three gathered requests; an explicit MAX_CONNECTIONS wins
+os.environ.setdefault('MAX_CONNECTIONS', '1')
+
+# Shipments generated by the massive data test; FORCE_REGEN regenerates them even if present
+TEST_BATCH_SIZE = 1000
+FORCE_REGEN = os.environ.get('FORCE_REGEN') == '1'
+
+# Run timestamp in whole seconds, taken once; names only need to differ between runs
+_TS = time.time_ns() // 1_000_000_000
+
+# Session shared by the tests in this process; see module_session()
+_SESSION = None
+
+# Modules the dashboard needs; only located unless RUN_DASHBOARD_RENDER is set
+DASHBOARD_MODULES = ('streamlit', 'plotly.express', 'plotly.graph_objects')
+RUN_DASHBOARD_RENDER = os.environ.get('RUN_DASHBOARD_RENDER') == '1'
+
+@contextmanager
+def module_session():
+    """Yield the session shared by every test in this process, opening it on first use."""
+    global _SESSION
+    if _SESSION is None:
+        from database.connection import get_db_session
+        _SESSION = get_db_session()
+    try:
+        yield _SESSION
+    finally:
+        # Tests only read, so end the transaction and hand the connection back to the pool
+        _SESSION.rollback()
+
+def close_module_session():
+    """Close the shared session, if one was opened."""
+    global _SESSION
+    if _SESSION is not None:
+        _SESSION.close()
+        _SESSION = None
+
+def has_test_batch():
+    """Check whether the shipments table already holds a full test batch."""
+    from sqlalchemy import text
+    # Stops after TEST_BATCH_SIZE rows instead of counting the whole table
+    with module_session() as session:
+        return session.execute(
+            text("SELECT EXISTS (SELECT 1 FROM shipments OFFSET :skip)"),
+            {"skip": TEST_BATCH_SIZE - 1}
+        ).scalar()
+
 def test_massive_data_generation():
     """Test generating 100x more data (25,000 shipments)."""
-    print("🚀 Testing Massive Data Generation (25,000 shipments)...")
-    print("=" * 60)
+    log.info("🚀 Testing Massive Data Generation (25,000 shipments)...")
+    log.info("=" * 60)
     
     try:
         # Import the massive data generator
         from generate_massive_data import generate_massive_data, check_data_distribution
         
-        # Generate a smaller test batch first (1,000 shipments)
-        print("📊 Generating test batch of 1,000 shipments...")
-        
-        # Test with smaller batch for faster testing
-        from etl.main import run_etl_pipeline
-        run_etl_pipeline(num_shipments=1000)
-        
-        print("✅ Test batch generation successful!")
+        # Earlier runs leave their batch behind, so only generate when it is missing
+        if not FORCE_REGEN and has_test_batch():
+            log.info(f"✅ Database already holds {TEST_BATCH_SIZE:,}+ shipments, skipping generation (set FORCE_REGEN=1 to regenerate)")
+        else:
+            # Generate a smaller test batch first (1,000 shipments)
+            log.info(f"📊 Generating test batch of {TEST_BATCH_SIZE:,} shipments...")
+            
+            # Test with smaller batch for faster testing
+            from etl.main import run_etl_pipeline
+            run_etl_pipeline(num_shipments=TEST_BATCH_SIZE)
+            
+            log.info("✅ Test batch generation successful!")
         
         # Check data distribution
-        print("\n📈 Checking data distribution...")
+        log.info("\n📈 Checking data distribution...")
         check_data_distribution()
         
         return True
         
     except Exception as e:
-        print(f"❌ Error in massive data generation: {e}")
+        log.error(f"❌ Error in massive data generation: {e}")
         return False
 
+@lru_cache(maxsize=None)
+def cached_real_time_metrics(hours_back):
+    """Real-time metrics, computed once per window for the whole test run."""
+    from analytics.advanced_analytics import RealTimeAnalytics
+    return RealTimeAnalytics().get_real_time_metrics(hours_back=hours_back)
+
+@lru_cache(maxsize=None)
+def cached_trends(days_back):
+    """Trend analysis, computed once per window for the whole test run."""
+    from analytics.advanced_analytics import PredictiveAnalytics
+    return PredictiveAnalytics().analyze_trends(days_back=days_back)
+
+@lru_cache(maxsize=None)
+def cached_forecast(days_ahead):
+    """Emissions forecast, computed once per horizon for the whole test run."""
+    from analytics.advanced_analytics import PredictiveAnalytics
+    return PredictiveAnalytics().forecast_emissions(days_ahead=days_ahead)
+
 def test_advanced_analytics():
     """Test advanced analytics features."""
-    print("\n🔍 Testing Advanced Analytics Features...")
-    print("=" * 50)
+    log.info("\n🔍 Testing Advanced Analytics Features...")
+    log.info("=" * 50)
     
     try:
-        from analytics.advanced_analytics import (
-            RealTimeAnalytics, 
-            SupplierAnalytics, 
-            PredictiveAnalytics,
-            get_advanced_analytics_summary
-        )
+        import pandas as pd
+        from analytics.advanced_analytics import SupplierAnalytics, get_advanced_analytics_summary
         
         # Test real-time analytics
-        print("📊 Testing Real-Time Analytics...")
-        real_time = RealTimeAnalytics()
-        real_time_metrics = real_time.get_real_time_metrics(hours_back=24)
+        log.info("📊 Testing Real-Time Analytics...")
+        real_time_metrics = cached_real_time_metrics(24)
         
         if real_time_metrics:
-            print(f"✅ Real-time metrics: {real_time_metrics.get('shipment_count', 0)} shipments")
-            print(f"   Total emissions: {real_time_metrics.get('total_emissions_kg', 0):.2f} kg")
-            print(f"   Anomalies detected: {real_time_metrics.get('anomalies_detected', 0)}")
+            log.info(f"✅ Real-time metrics: {real_time_metrics.get('shipment_count', 0)} shipments")
+            log.info(f"   Total emissions: {real_time_metrics.get('total_emissions_kg', 0):.2f} kg")
+            log.info(f"   Anomalies detected: {real_time_metrics.get('anomalies_detected', 0)}")
         else:
-            print("⚠️ No real-time data available")
+            log.warning("⚠️ No real-time data available")
         
         # Test supplier analytics
-        print("\n🏭 Testing Supplier Analytics...")
+        log.info("\n🏭 Testing Supplier Analytics...")
         supplier_analytics = SupplierAnalytics()
         
         # Get a sample supplier ID
-        from database.connection import get_db_session
+        from sqlalchemy import select
         from database.models import Shipment
         
-        session = get_db_session()
-        sample_supplier = session.query(Shipment.supplier_id).first()
-        session.close()
+        with module_session() as session:
+            sample_supplier = session.execute(select(Shipment.supplier_id).limit(1)).scalar()
         
         if sample_supplier:
             supplier_score = supplier_analytics.calculate_supplier_sustainability_score(
-                sample_supplier[0]
+                sample_supplier
             )
             if 'sustainability_score' in supplier_score:
-                print(f"✅ Supplier sustainability score: {supplier_score['sustainability_score']:.2f}")
+                log.info(f"✅ Supplier sustainability score: {supplier_score['sustainability_score']:.2f}")
             else:
-                print(f"⚠️ Supplier analysis: {supplier_score.get('error', 'Unknown error')}")
+                log.warning(f"⚠️ Supplier analysis: {supplier_score.get('error', 'Unknown error')}")
         
         # Test predictive analytics
-        print("\n🔮 Testing Predictive Analytics...")
-        predictive = PredictiveAnalytics()
+        log.info("\n🔮 Testing Predictive Analytics...")
         
         # Test trend analysis
-        trend_analysis = predictive.analyze_trends(days_back=30)
+        trend_analysis = cached_trends(30)
         if 'trends' in trend_analysis:
-            print("✅ Trend analysis completed")
-            for trend_name, trend_data in trend_analysis['trends'].items():
-                print(f"   {trend_name}: {trend_data['direction']}")
+            log.info("✅ Trend analysis completed")
+            # One formatted dump however many trends there are
+            trends = pd.DataFrame.from_dict(trend_analysis['trends'], orient='index')
+            log.info(textwrap.indent(trends['direction'].to_string(header=False), "   "))
         else:
-            print(f"⚠️ Trend analysis: {trend_analysis.get('error', 'Unknown error')}")
+            log.warning(f"⚠️ Trend analysis: {trend_analysis.get('error', 'Unknown error')}")
         
         # Test emissions forecasting
-        emissions_forecast = predictive.forecast_emissions(days_ahead=7)
+        emissions_forecast = cached_forecast(7)
         if 'forecast_emissions' in emissions_forecast:
-            print("✅ Emissions forecasting completed")
-            print(f"   Average daily forecast: {emissions_forecast['avg_daily_forecast']:.2f} kg")
+            log.info("✅ Emissions forecasting completed")
+            log.info(f"   Average daily forecast: {emissions_forecast['avg_daily_forecast']:.2f} kg")
         else:
-            print(f"⚠️ Emissions forecast: {emissions_forecast.get('error', 'Unknown error')}")
+            log.warning(f"⚠️ Emissions forecast: {emissions_forecast.get('error', 'Unknown error')}")
         
         # Test comprehensive analytics summary
-        print("\n📋 Testing Comprehensive Analytics Summary...")
-        summary = get_advanced_analytics_summary()
+        log.info("\n📋 Testing Comprehensive Analytics Summary...")
+        # Reuse the results above instead of recomputing them inside the summary
+        summary = get_advanced_analytics_summary(
+            real_time_metrics=real_time_metrics,
+            trend_analysis=trend_analysis,
+            emissions_forecast=emissions_forecast
+        )
         if summary:
-            print("✅ Advanced analytics summary generated successfully")
+            log.info("✅ Advanced analytics summary generated successfully")
         
         return True
         
     except Exception as e:
-        print(f"❌ Error in advanced analytics: {e}")
+        log.error(f"❌ Error in advanced analytics: {e}")
         return False
 
 def test_cloud_deployment_preparation():
     """Test cloud deployment preparation."""
-    print("\n☁️ Testing Cloud Deployment Preparation...")
-    print("=" * 50)
+    log.info("\n☁️ Testing Cloud Deployment Preparation...")
+    log.info("=" * 50)
     
     try:
         # Test AWS dependencies
-        print("🔧 Testing AWS Dependencies...")
+        log.info("🔧 Testing AWS Dependencies...")
         import boto3
-        print("✅ boto3 imported successfully")
+        log.info("✅ boto3 imported successfully")
         
         # Test Lambda deployment package creation
-        print("\n📦 Testing Lambda Deployment Package...")
+        log.info("\n📦 Testing Lambda Deployment Package...")
         from cloud.aws_deployment import AWSDeployer
         
         deployer = AWSDeployer()
@@ -143,84 +230,84 @@ def test_cloud_deployment_preparation():
         lambda_files = ['lambda_function.py', 'lambda_requirements.txt']
         for file in lambda_files:
             if os.path.exists(file):
-                print(f"✅ {file} created successfully")
+                log.info(f"✅ {file} created successfully")
             else:
-                print(f"❌ {file} not found")
+                log.error(f"❌ {file} not found")
         
         # Test S3 bucket name generation
-        import time
-        bucket_name = f"supply-chain-carbon-analytics-models-{int(time.time())}"
-        print(f"✅ S3 bucket name generated: {bucket_name}")
+        bucket_name = f"supply-chain-carbon-analytics-models-{_TS}"
+        log.info(f"✅ S3 bucket name generated: {bucket_name}")
         
         return True
         
     except Exception as e:
-        print(f"❌ Error in cloud deployment preparation: {e}")
+        log.error(f"❌ Error in cloud deployment preparation: {e}")
         return False
 
+async def fetch_endpoints(paths):
+    """Request the given paths concurrently from the in-process API app."""
+    from api.main import app
+    
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=API_BASE_URL) as client:
+        return await asyncio.gather(*(client.get(path, timeout=10) for path in paths))
+
 def test_api_with_advanced_endpoints():
     """Test API with new advanced endpoints."""
-    print("\n🌐 Testing API with Advanced Endpoints...")
-    print("=" * 50)
+    log.info("\n🌐 Testing API with Advanced Endpoints...")
+    log.info("=" * 50)
     
     try:
-        # Start API server
-        print("🚀 Starting API server...")
-        api_process = subprocess.Popen([
-            sys.executable, "-m", "uvicorn", "api.main:app", 
-            "--host", "127.0.0.1", "--port", "8000"
-        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        
-        # Wait for server to start
-        time.sleep(5)
-        
-        # Test basic endpoints
-        base_url = "http://127.0.0.1:8000"
+        # Requests dispatch straight into the ASGI app, so no server has to boot
+        log.info("🚀 Loading API app in-process...")
+        health, shipments, summary = asyncio.run(
+            fetch_endpoints(["/health", "/shipments", "/emissions/summary"])
+        )
         
         # Test health check
-        print("🏥 Testing health check...")
-        response = requests.get(f"{base_url}/health", timeout=10)
-        if response.status_code == 200:
-            print("✅ Health check passed")
+        log.info("🏥 Testing health check...")
+        if health.status_code == 200:
+            log.info("✅ Health check passed")
         else:
-            print(f"❌ Health check failed: {response.status_code}")
+            log.error(f"❌ Health check failed: {health.status_code}")
         
         # Test shipments endpoint
-        print("📦 Testing shipments endpoint...")
-        response = requests.get(f"{base_url}/shipments", timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            print(f"✅ Shipments endpoint: {len(data)} shipments")
+        log.info("📦 Testing shipments endpoint...")
+        if shipments.status_code == 200:
+            data = shipments.json()
+            log.info(f"✅ Shipments endpoint: {len(data)} shipments")
         else:
-            print(f"❌ Shipments endpoint failed: {response.status_code}")
+            log.error(f"❌ Shipments endpoint failed: {shipments.status_code}")
         
         # Test emissions summary
-        print("🌱 Testing emissions summary...")
-        response = requests.get(f"{base_url}/emissions/summary", timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            print(f"✅ Emissions summary: {data.get('total_emissions_kg', 0):.2f} kg total")
+        log.info("🌱 Testing emissions summary...")
+        if summary.status_code == 200:
+            data = summary.json()
+            log.info(f"✅ Emissions summary: {data.get('total_emissions_kg', 0):.2f} kg total")
         else:
-            print(f"❌ Emissions summary failed: {response.status_code}")
-        
-        # Stop API server
-        api_process.terminate()
-        api_process.wait()
+            log.error(f"❌ Emissions summary failed: {summary.status_code}")
         
         return True
         
     except Exception as e:
-        print(f"❌ Error testing API: {e}")
+        log.error(f"❌ Error testing API: {e}")
+        return False
+
+def module_available(name):
+    """Check whether a module can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ModuleNotFoundError:
+        # Raised for a dotted name whose parent package is missing
         return False
 
 def test_dashboard_with_massive_data():
     """Test dashboard with massive dataset."""
-    print("\n📊 Testing Dashboard with Massive Data...")
-    print("=" * 50)
+    log.info("\n📊 Testing Dashboard with Massive Data...")
+    log.info("=" * 50)
     
     try:
         # Test dashboard startup
-        print("🚀 Testing dashboard startup...")
+        log.info("🚀 Testing dashboard startup...")
         
         # Check if dashboard files exist
         dashboard_files = [
@@ -230,33 +317,71 @@ def test_dashboard_with_massive_data():
         
         for file in dashboard_files:
             if os.path.exists(file):
-                print(f"✅ {file} exists")
+                log.info(f"✅ {file} exists")
             else:
-                print(f"❌ {file} not found")
-        
-        # Test dashboard imports
-        print("\n📦 Testing dashboard imports...")
-        import streamlit as st
-        import plotly.express as px
-        import plotly.graph_objects as go
-        print("✅ Dashboard dependencies imported successfully")
+                log.error(f"❌ {file} not found")
+        
+        # Locate dashboard dependencies without paying their import cost
+        log.info("\n📦 Testing dashboard dependencies...")
+        missing = [module for module in DASHBOARD_MODULES if not module_available(module)]
+        if missing:
+            log.error(f"❌ Dashboard dependencies not found: {', '.join(missing)}")
+            return False
+        log.info("✅ Dashboard dependencies available")
+        
+        # Importing for real is only needed when actually rendering
+        if RUN_DASHBOARD_RENDER:
+            import streamlit as st
+            import plotly.express as px
+            import plotly.graph_objects as go
+            log.info("✅ Dashboard dependencies imported successfully")
         
         return True
         
     except Exception as e:
-        print(f"❌ Error testing dashboard: {e}")
+        log.error(f"❌ Error testing dashboard: {e}")
         return False
 
+def run_test(test_func):
+    """Run a test function and return (result, error)."""
+    try:
+        return test_func(), None
+    except Exception as e:
+        return False, e
+
+def run_captured(test_func):
+    """Run a test in a worker process, capturing its output so it prints unmixed."""
+    buffer = io.StringIO()
+    previous = LOG_HANDLER.setStream(buffer)
+    try:
+        with redirect_stdout(buffer):
+            result, error = run_test(test_func)
+    finally:
+        LOG_HANDLER.setStream(previous)
+    return result, error, buffer.getvalue()
+
+def report_test(test_name, result, error):
+    """Print the outcome of a test and return whether it passed."""
+    if error is not None:
+        log.error(f"\n❌ ERROR: {test_name} - {error}")
+        return False
+    status = "✅ PASSED" if result else "❌ FAILED"
+    log.info(f"\n{status}: {test_name}")
+    return result
+
 def main():
     """Run all Phase 3 tests."""
-    print("🎯 Phase 3: Advanced Analytics and Cloud Deployment")
-    print("=" * 70)
-    print(f"Test started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print()
+    log.info("🎯 Phase 3: Advanced Analytics and Cloud Deployment")
+    log.info("=" * 70)
+    log.info(f"Test started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    log.info("")
     
-    tests = [
+    # Database-writing tests run here, in order; the independent ones overlap with them
+    serial_tests = [
         ("Massive Data Generation", test_massive_data_generation),
         ("Advanced Analytics", test_advanced_analytics),
+    ]
+    parallel_tests = [
         ("Cloud Deployment Preparation", test_cloud_deployment_preparation),
         ("API with Advanced Endpoints", test_api_with_advanced_endpoints),
         ("Dashboard with Massive Data", test_dashboard_with_massive_data)
@@ -264,43 +389,58 @@ def main():
     
     results = []
     
-    for test_name, test_func in tests:
-        print(f"\n{'='*20} {test_name} {'='*20}")
-        try:
-            result = test_func()
-            results.append((test_name, result))
-            status = "✅ PASSED" if result else "❌ FAILED"
-            print(f"\n{status}: {test_name}")
-        except Exception as e:
-            print(f"\n❌ ERROR: {test_name} - {e}")
-            results.append((test_name, False))
-    
-    # Summary
-    print("\n" + "=" * 70)
-    print("📊 PHASE 3 TEST SUMMARY")
-    print("=" * 70)
+    try:
+        with ProcessPoolExecutor(max_workers=len(parallel_tests)) as executor:
+            futures = [(test_name, executor.submit(run_captured, test_func)) for test_name, test_func in parallel_tests]
+            
+            for test_name, test_func in serial_tests:
+                log.info(f"\n{'='*20} {test_name} {'='*20}")
+                result, error = run_test(test_func)
+                results.append((test_name, report_test(test_name, result, error)))
+            
+            # Print each worker's captured output in order once it finishes
+            for test_name, future in futures:
+                log.info(f"\n{'='*20} {test_name} {'='*20}")
+                try:
+                    result, error, output = future.result()
+                except Exception as e:
+                    result, error, output = False, e, ""
+                if output:
+                    log.info(output.rstrip("\n"))
+                results.append((test_name, report_test(test_name, result, error)))
+    finally:
+        close_module_session()
     
+    # Summary, emitted as a single record
     passed = sum(1 for _, result in results if result)
     total = len(results)
     
+    summary = [
+        "\n" + "=" * 70,
+        "📊 PHASE 3 TEST SUMMARY",
+        "=" * 70,
+    ]
     for test_name, result in results:
         status = "✅ PASSED" if result else "❌ FAILED"
-        print(f"{status}: {test_name}")
+        summary.append(f"{status}: {test_name}")
     
-    print(f"\n🎯 Overall: {passed}/{total} tests passed ({passed/total*100:.1f}%)")
+    summary.append(f"\n🎯 Overall: {passed}/{total} tests passed ({passed/total*100:.1f}%)")
     
     if passed == total:
-        print("\n🎉 All Phase 3 tests passed! Ready for cloud deployment.")
-        print("\n📝 Next Steps:")
-        print("1. Generate full 25,000 shipment dataset: python generate_massive_data.py")
-        print("2. Launch dashboard: streamlit run dashboard/streamlit_app.py")
-        print("3. Deploy to AWS: python cloud/aws_deployment.py")
-        print("4. Setup CI/CD pipeline")
-        print("5. Configure monitoring and alerts")
+        summary.extend([
+            "\n🎉 All Phase 3 tests passed! Ready for cloud deployment.",
+            "\n📝 Next Steps:",
+            "1. Generate full 25,000 shipment dataset: python generate_massive_data.py",
+            "2. Launch dashboard: streamlit run dashboard/streamlit_app.py",
+            "3. Deploy to AWS: python cloud/aws_deployment.py",
+            "4. Setup CI/CD pipeline",
+            "5. Configure monitoring and alerts",
+        ])
     else:
-        print(f"\n⚠️ {total-passed} test(s) failed. Please review and fix issues.")
+        summary.append(f"\n⚠️ {total-passed} test(s) failed. Please review and fix issues.")
     
-    print(f"\nTest completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    summary.append(f"\nTest completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    log.info("\n".join(summary))
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file